@@ -1,57 +1,273 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import (
+    Flask, Response, abort, flash, make_response, redirect, render_template,
+    request, session, stream_with_context, url_for
+)
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy import event, inspect, lambda_stmt, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.schema import CreateIndex, CreateTable
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+import click
+import codecs
+import csv
+import hashlib
+import orjson
 import os
+import sqlite3
+import threading
+import zlib
 
 # Initialize Flask app
 app = Flask(__name__)
 app.secret_key = 'expense_tracker_secret_key'
+# Persist compiled templates so new worker processes skip Jinja compilation
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
 
 # Configure database
 basedir = os.path.abspath(os.path.dirname(__file__))
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'expenses.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Keep SQLite connections open across requests so the page cache stays warm
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'poolclass': QueuePool,
+    'pool_size': 8,
+    'max_overflow': 16,
+    'pool_pre_ping': True,
+    'pool_recycle': 3600,
+    'connect_args': {'check_same_thread': False, 'timeout': 30},
+}
+
+# Pragmas applied to every new SQLite connection
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=268435456',
+)
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+@event.listens_for(Engine, 'close')
+def optimize_sqlite(dbapi_connection, connection_record):
+    # Lets SQLite refresh planner statistics that have drifted since the last ANALYZE
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute('PRAGMA optimize')
 
 # Initialize SQLAlchemy
 db = SQLAlchemy(app)
 
+CENT = Decimal('0.01')
+
+# Largest amount whose cents still fit SQLite's signed 64-bit INTEGER
+MAX_AMOUNT = Decimal(2 ** 63 - 1).scaleb(-2)
+
+class Cents(db.TypeDecorator):
+    """Store a dollar amount as whole cents in an INTEGER column."""
+    impl = db.Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        # str() keeps a float's shortest form, so 87.3 becomes 8730 cents rather than 8729
+        return int(Decimal(str(value)).quantize(CENT, ROUND_HALF_UP).scaleb(2))
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else value / 100
+
 # Define Expense model
 class Expense(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    # Exact integer cents in the database; sorts and groups cheaply
+    amount = db.Column('amount_cents', Cents, key='amount', nullable=False)
     category = db.Column(db.String(50), nullable=False)
-    date = db.Column(db.Date, nullable=False, default=datetime.utcnow)
+    date = db.Column(db.Date, nullable=False, default=date.today)
     description = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Leading slice of description, populated only by list queries that ask for it
+    description_preview = db.query_expression()
+
+    __table_args__ = (
+        # Covers GROUP BY category with TOTAL(amount) without touching the table
+        db.Index('ix_expense_cat_amount', 'category', 'amount'),
+        # Serves ORDER BY date DESC, id as an ordered index walk
+        db.Index('ix_expense_date_id', date.desc(), id),
+    )
 
     def __repr__(self):
         return f'<Expense {self.title}>'
 
+def _amount_total():
+    """SQL total of the amounts in dollars.
+
+    SQLite's TOTAL() sums as a float, so unlike SUM() over INTEGER cents it
+    cannot overflow, and it returns 0.0 rather than NULL for no rows.
+    """
+    return db.func.total(Expense.amount, type_=Cents)
+
+# Expenses listed per index page
+PAGE_SIZE = 50
+
+# Enough characters for the index template's truncate(30), which keeps up to 35
+DESCRIPTION_PREVIEW_LENGTH = 36
+
+# Rendered pages per view, stored with the data fingerprint they were built from.
+# Least recently used views are evicted beyond PAGE_CACHE_SIZE so memory stays bounded.
+PAGE_CACHE_SIZE = 32
+_page_cache = OrderedDict()
+_page_cache_lock = threading.Lock()
+
+def data_fingerprint():
+    """Return (row count, latest update); any add, edit or delete changes it."""
+    return tuple(db.session.query(db.func.count(Expense.id), db.func.max(Expense.updated_at)).one())
+
+def data_etag(fingerprint=None):
+    """Return a short ETag derived from the data fingerprint."""
+    count, last_updated = fingerprint or data_fingerprint()
+    return hashlib.blake2b(f'{count}:{last_updated}'.encode(), digest_size=8).hexdigest()
+
+def not_modified(etag):
+    """Return a bodiless 304 response for a client that already has this ETag."""
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+def render_cached(view, render):
+    """Serve the cached HTML for a view until the expense data changes."""
+    # Pages carrying flash messages are one-off and must not be cached
+    if '_flashes' in session:
+        return render()
+
+    fingerprint = data_fingerprint()
+    etag = data_etag(fingerprint)
+    if request.if_none_match.contains(etag):
+        return not_modified(etag)
+
+    with _page_cache_lock:
+        cached = _page_cache.get(view)
+        if cached is not None:
+            _page_cache.move_to_end(view)
+    if cached is not None and cached[0] == fingerprint:
+        html = cached[1]
+    else:
+        html = render()
+        with _page_cache_lock:
+            _page_cache[view] = (fingerprint, html)
+            _page_cache.move_to_end(view)
+            while len(_page_cache) > PAGE_CACHE_SIZE:
+                _page_cache.popitem(last=False)
+
+    response = make_response(html)
+    response.set_etag(etag)
+    return response
+
+def gzip_stream(chunks):
+    """Gzip an iterable of byte chunks incrementally."""
+    compressor = zlib.compressobj(wbits=31)  # 31 selects the gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
 # Routes
 @app.route('/')
 def index():
-    expenses = Expense.query.order_by(Expense.date.desc()).all()
-    total_amount = sum(expense.amount for expense in expenses)
-    return render_template('index.html', expenses=expenses, total_amount=total_amount)
+    page = max(request.args.get('page', 1, type=int), 1)
+    # Pages past the end don't exist; this also keeps the SQL OFFSET in range
+    if page > 1 and (page - 1) * PAGE_SIZE >= db.session.query(db.func.count(Expense.id)).scalar():
+        abort(404)
+
+    def render():
+        # Load just the listed columns; the description is shown truncated, so skip its full TEXT.
+        # raiseload turns any relationship lazily loaded per row into an error instead of N+1 queries.
+        rows = Expense.query.options(
+            db.load_only(Expense.title, Expense.amount, Expense.category, Expense.date),
+            db.raiseload('*'),
+            db.with_expression(
+                Expense.description_preview,
+                db.func.substr(Expense.description, 1, DESCRIPTION_PREVIEW_LENGTH)
+            ),
+        ).order_by(Expense.date.desc(), Expense.id).limit(PAGE_SIZE + 1).offset((page - 1) * PAGE_SIZE).all()
+        # The extra row only tells us whether another page follows
+        expenses, has_next = rows[:PAGE_SIZE], len(rows) > PAGE_SIZE
+        total_amount = db.session.query(_amount_total()).scalar()
+        return render_template('index.html', expenses=expenses, total_amount=total_amount,
+                               page=page, has_next=has_next)
+
+    return render_cached(('index', page), render)
+
+# Fields a submitted expense form must provide
+REQUIRED_FIELDS = ('title', 'amount', 'category')
+
+def _build_expense_dict(data):
+    """Validate a submitted expense form (or CSV record) in a single pass.
+
+    Returns a dict of Expense column values and a dict of field errors.
+    A blank date is left out so the caller keeps its default.
+    """
+    errors = {
+        field: 'This field is required.'
+        for field in REQUIRED_FIELDS
+        if not (data.get(field) or '').strip()
+    }
+    values = {
+        'title': data.get('title'),
+        'category': data.get('category'),
+        'description': data.get('description'),
+    }
+
+    if 'amount' not in errors:
+        try:
+            amount = Decimal(data['amount']).quantize(CENT, ROUND_HALF_UP)
+        except InvalidOperation:
+            errors['amount'] = 'Invalid amount'
+        else:
+            # Cents beyond MAX_AMOUNT would overflow the INTEGER column
+            if not amount.is_finite() or abs(amount) > MAX_AMOUNT:
+                errors['amount'] = 'Invalid amount'
+            else:
+                values['amount'] = amount
+
+    date_str = data.get('date')
+    if date_str:
+        try:
+            values['date'] = date.fromisoformat(date_str)
+        except ValueError:
+            errors['date'] = 'Invalid date'
+
+    return values, errors
+
+def bulk_add(rows):
+    """Insert many expense dicts with one executemany and a single commit."""
+    rows = list(rows)
+    if rows:
+        db.session.execute(db.insert(Expense.__table__), rows)
+        db.session.commit()
+    return len(rows)
 
 @app.route('/add', methods=['GET', 'POST'])
 def add():
     if request.method == 'POST':
-        title = request.form.get('title')
-        amount = float(request.form.get('amount'))
-        category = request.form.get('category')
-        date_str = request.form.get('date')
-        description = request.form.get('description')
-        
-        date = datetime.strptime(date_str, '%Y-%m-%d') if date_str else datetime.utcnow()
-        
-        expense = Expense(
-            title=title, 
-            amount=amount, 
-            category=category, 
-            date=date, 
-            description=description
-        )
+        values, errors = _build_expense_dict(request.form.to_dict())
+        if errors:
+            flash('Error adding expense', 'danger')
+            return render_template('add.html', now=date.today(), errors=errors), 400
+
+        expense = Expense(**values)
         
         db.session.add(expense)
         db.session.commit()
@@ -60,19 +276,47 @@ def add():
         return redirect(url_for('index'))
     
     # Pass today's date to the template
-    return render_template('add.html', now=datetime.utcnow())
+    return render_template('add.html', now=date.today())
+
+@app.route('/import', methods=['POST'])
+def import_expenses():
+    upload = request.files.get('file')
+    if not upload:
+        flash('Choose a CSV file to import', 'danger')
+        return redirect(url_for('index'))
+
+    # Validate every record first so a bad line imports nothing
+    rows = []
+    today = date.today()
+    reader = csv.DictReader(codecs.iterdecode(upload.stream, 'utf-8-sig'))
+    try:
+        for line_number, record in enumerate(reader, start=2):
+            values, errors = _build_expense_dict(record)
+            if errors:
+                flash(f'Error importing expenses: line {line_number} is invalid', 'danger')
+                return redirect(url_for('index'))
+            # executemany needs the same columns in every row
+            values.setdefault('date', today)
+            rows.append(values)
+    except (UnicodeDecodeError, csv.Error):
+        flash('Error importing expenses: the file is not a UTF-8 CSV', 'danger')
+        return redirect(url_for('index'))
+
+    flash(f'Imported {bulk_add(rows)} expenses', 'success')
+    return redirect(url_for('index'))
 
 @app.route('/edit/<int:id>', methods=['GET', 'POST'])
 def edit(id):
-    expense = Expense.query.get_or_404(id)
+    expense = db.session.get(Expense, id) or abort(404)
     
     if request.method == 'POST':
-        expense.title = request.form.get('title')
-        expense.amount = float(request.form.get('amount'))
-        expense.category = request.form.get('category')
-        date_str = request.form.get('date')
-        expense.date = datetime.strptime(date_str, '%Y-%m-%d') if date_str else expense.date
-        expense.description = request.form.get('description')
+        values, errors = _build_expense_dict(request.form.to_dict())
+        if errors:
+            flash('Error updating expense', 'danger')
+            return render_template('edit.html', expense=expense, errors=errors), 400
+
+        for field, value in values.items():
+            setattr(expense, field, value)
         
         db.session.commit()
         flash('Expense updated successfully!', 'success')
@@ -80,47 +324,115 @@ def edit(id):
         
     return render_template('edit.html', expense=expense)
 
-@app.route('/delete/<int:id>')
+@app.route('/delete/<int:id>', methods=['POST'])
 def delete(id):
-    expense = Expense.query.get_or_404(id)
-    db.session.delete(expense)
+    # A single DELETE by primary key; no need to load the row first
+    result = db.session.execute(db.delete(Expense).where(Expense.id == id))
     db.session.commit()
+    if result.rowcount == 0:
+        abort(404)
     flash('Expense deleted successfully!', 'danger')
     return redirect(url_for('index'))
 
 @app.route('/categories')
 def categories():
-    expenses = Expense.query.all()
-    categories = {}
-    
-    for expense in expenses:
-        if expense.category in categories:
-            categories[expense.category] += expense.amount
-        else:
-            categories[expense.category] = expense.amount
-            
-    return render_template('categories.html', categories=categories)
+    def render():
+        rows = db.session.query(Expense.category, _amount_total()).group_by(Expense.category).all()
+        return render_template('categories.html', categories=dict(rows))
+
+    return render_cached('categories', render)
+
+# Built once as a lambda statement so each request reuses its cached construction and compilation
+API_EXPENSES_STMT = lambda_stmt(lambda: select(
+    Expense.id, Expense.title, Expense.amount.label('amount'),
+    Expense.category, Expense.date, Expense.description
+).order_by(Expense.date.desc(), Expense.id).execution_options(yield_per=1000))
 
 @app.route('/api/expenses')
 def api_expenses():
-    expenses = Expense.query.order_by(Expense.date.desc()).all()
-    result = []
-    
-    for expense in expenses:
-        result.append({
-            'id': expense.id,
-            'title': expense.title,
-            'amount': expense.amount,
-            'category': expense.category,
-            'date': expense.date.strftime('%Y-%m-%d'),
-            'description': expense.description
-        })
-        
-    return jsonify(result)
+    # Repeated keys make the JSON highly compressible; gzip it as it streams
+    gzipped = request.accept_encodings['gzip'] > 0
+    # Each content-coding is its own representation, so it needs its own strong ETag
+    etag = data_etag() + ('-gzip' if gzipped else '')
+
+    # Clients holding the current ETag get a bodiless 304 instead of the full payload
+    if request.if_none_match.contains(etag):
+        response = not_modified(etag)
+        response.vary.add('Accept-Encoding')
+        return response
+
+    # Stream the array one batch of rows at a time so memory stays bounded
+    def generate():
+        yield b'['
+        separator = b''
+        # orjson encodes the date column to ISO-8601 itself
+        for rows in db.session.execute(API_EXPENSES_STMT).mappings().partitions():
+            yield separator + b','.join(orjson.dumps(dict(row)) for row in rows)
+            separator = b','
+        yield b']'
+
+    body = generate()
+    if gzipped:
+        body = gzip_stream(body)
+
+    response = Response(stream_with_context(body), mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if gzipped:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag)
+    return response
+
+# Bump whenever the schema changes so existing databases are migrated once
+SCHEMA_VERSION = 5
+
+def _rebuild_amounts_as_cents(conn):
+    """Replace the REAL dollar amount column with INTEGER cents by rebuilding the table."""
+    rebuilt = Expense.__table__.to_metadata(db.MetaData(), name='expense_rebuilt')
+    conn.execute(CreateTable(rebuilt))
+    conn.execute(text(
+        'INSERT INTO expense_rebuilt (id, title, amount_cents, category, date, description, updated_at) '
+        'SELECT id, title, CAST(ROUND(amount * 100) AS INTEGER), category, date, description, updated_at '
+        'FROM expense'
+    ))
+    # Dropping the old table also drops its indexes; they are recreated below
+    conn.execute(text('DROP TABLE expense'))
+    conn.execute(text('ALTER TABLE expense_rebuilt RENAME TO expense'))
+
+def migrate_db(engine=None):
+    """Create or upgrade the schema; a no-op once the database is current."""
+    engine = engine or db.engine
+    with engine.connect() as conn:
+        if conn.execute(text('PRAGMA user_version')).scalar() >= SCHEMA_VERSION:
+            return
+
+    db.Model.metadata.create_all(engine)
+    # create_all() skips existing tables, so add any columns and indexes they are missing
+    with engine.begin() as conn:
+        # pysqlite autocommits DDL outside an explicit transaction; BEGIN makes the upgrade all-or-nothing
+        conn.execute(text('BEGIN'))
+        columns = {column['name'] for column in inspect(conn).get_columns('expense')}
+        if 'updated_at' not in columns:
+            conn.execute(text('ALTER TABLE expense ADD COLUMN updated_at DATETIME'))
+        if 'amount' in columns:
+            _rebuild_amounts_as_cents(conn)
+        for index in Expense.__table__.indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+        # Superseded by ix_expense_cat_amount and ix_expense_date_id
+        conn.execute(text('DROP INDEX IF EXISTS ix_expense_category'))
+        conn.execute(text('DROP INDEX IF EXISTS ix_expense_date_desc'))
+        # Gather planner statistics so ORDER BY date and GROUP BY category use the new indexes
+        conn.execute(text('ANALYZE'))
+        conn.execute(text(f'PRAGMA user_version = {SCHEMA_VERSION}'))
 
-# Create the database tables
-with app.app_context():
-    db.create_all()
+@app.cli.command('init-db')
+def init_db_command():
+    """Create or upgrade the database schema (run once per deploy)."""
+    migrate_db()
+    click.echo('Database schema is up to date.')
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    # Development server only: it migrates on start and enables debug with FLASK_DEBUG=1.
+    # Production runs `flask init-db` once and serves wsgi:application with gunicorn.
+    with app.app_context():
+        migrate_db()
+    app.run()
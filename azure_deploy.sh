@@ -24,12 +24,12 @@ DEPLOY_DIR="deployment"
 mkdir -p $DEPLOY_DIR
 
 # Copy necessary files
-cp -r app.py requirements.txt templates static $DEPLOY_DIR/
+cp -r app.py wsgi.py requirements.txt templates static $DEPLOY_DIR/
 
 # Create a simple startup script for Azure
 echo "Creating startup script for Azure..."
 cat > $DEPLOY_DIR/startup.txt << EOL
-gunicorn --bind=0.0.0.0 --timeout 600 app:app
+FLASK_APP=app flask init-db && gunicorn --bind=0.0.0.0 --workers 4 --threads 4 --timeout 600 wsgi:application
 EOL
 
 # Create .deployment file for Azure
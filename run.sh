@@ -27,4 +27,4 @@ echo -e "${GREEN}Setup complete!${NC}"
 echo -e "${GREEN}Starting Expense Tracker application...${NC}"
 
 # Run the Flask application
-python app.py
+FLASK_DEBUG=1 python app.py
@@ -12,6 +12,7 @@ def main():
     parser.add_argument("--html", action="store_true", help="Generate HTML coverage report")
     parser.add_argument("--xml", action="store_true", help="Generate XML coverage report for CI/CD")
     parser.add_argument("--verbose", "-v", action="store_true", help="Verbose output")
+    parser.add_argument("--workers", "-n", default="auto", help="Number of parallel test processes (default: one per CPU)")
     args = parser.parse_args()
     
     # Add the parent directory to sys.path
@@ -23,6 +24,9 @@ def main():
     if args.verbose:
         pytest_args.append("-v")
     
+    # Spread the tests across processes; each worker builds its own in-memory database
+    pytest_args += ["-n", args.workers]
+    
     # Always run with coverage
     pytest_args.append("--cov=app")
     pytest_args.append("--cov-report=term")
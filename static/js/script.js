@@ -25,10 +25,10 @@ document.addEventListener('DOMContentLoaded', function() {
     });
     
     // Add confirmation for delete actions
-    const deleteLinks = document.querySelectorAll('a[href*="/delete/"]');
-    deleteLinks.forEach(link => {
-        if (!link.getAttribute('onclick')) {
-            link.setAttribute('onclick', "return confirm('Are you sure you want to delete this expense?');");
+    const deleteForms = document.querySelectorAll('form[action*="/delete/"]');
+    deleteForms.forEach(form => {
+        if (!form.getAttribute('onsubmit')) {
+            form.setAttribute('onsubmit', "return confirm('Are you sure you want to delete this expense?');");
         }
     });
 });
@@ -1,74 +1,158 @@
+import contextlib
 import pytest
-import os
-import sys
-import tempfile
-from datetime import datetime
+from datetime import date
+from types import SimpleNamespace
+from flask import url_for
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
 
-# Add the parent directory to sys.path to import the app
-parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-sys.path.insert(0, parent_dir)
-
-# Import here to avoid circular imports
+# pytest.ini puts the project root on sys.path; import here to avoid circular imports
 import app as flask_app_module
 from app import db, Expense
 
-@pytest.fixture
+# Sample data seeded once per session; explicit ids keep /edit/1 and /delete/2 stable
+SEED_EXPENSES = [
+    {
+        'id': 1,
+        'title': 'Grocery Shopping',
+        'amount': 150.75,
+        'category': 'Food',
+        'date': date(2025, 5, 1),
+        'description': 'Weekly groceries'
+    },
+    {
+        'id': 2,
+        'title': 'Electric Bill',
+        'amount': 87.30,
+        'category': 'Utilities',
+        'date': date(2025, 5, 5),
+        'description': 'Monthly electricity bill'
+    },
+    {
+        'id': 3,
+        'title': 'Movie Tickets',
+        'amount': 35.50,
+        'category': 'Entertainment',
+        'date': date(2025, 5, 10),
+        'description': 'Weekend movie'
+    }
+]
+
+@pytest.fixture(scope='session')
 def app():
-    """Create and configure a Flask app for testing."""
-    # Create a temporary file to isolate the database for each test
-    db_fd, db_path = tempfile.mkstemp()
-    
+    """Create and configure a Flask app, building and seeding its database once per session."""
     test_app = flask_app_module.app
     test_app.config['TESTING'] = True
-    test_app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    # Keep the test database in RAM; StaticPool shares its single connection across requests
+    test_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    test_app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'poolclass': StaticPool,
+        'connect_args': {'check_same_thread': False},
+    }
     test_app.config['WTF_CSRF_ENABLED'] = False  # Disable CSRF for testing
     
     # Create the database and the tables
     with test_app.app_context():
         db.create_all()
         
-        # Add some sample data
-        sample_expenses = [
-            Expense(
-                title='Grocery Shopping', 
-                amount=150.75, 
-                category='Food', 
-                date=datetime.strptime('2025-05-01', '%Y-%m-%d'),
-                description='Weekly groceries'
-            ),
-            Expense(
-                title='Electric Bill', 
-                amount=87.30, 
-                category='Utilities', 
-                date=datetime.strptime('2025-05-05', '%Y-%m-%d'),
-                description='Monthly electricity bill'
-            ),
-            Expense(
-                title='Movie Tickets', 
-                amount=35.50, 
-                category='Entertainment', 
-                date=datetime.strptime('2025-05-10', '%Y-%m-%d'),
-                description='Weekend movie'
-            )
-        ]
-        
-        for expense in sample_expenses:
-            db.session.add(expense)
-        
+        # Add the sample data with a single executemany INSERT
+        db.session.execute(db.insert(Expense.__table__), SEED_EXPENSES)
         db.session.commit()
     
     yield test_app
     
-    # Close and remove the temporary database
-    os.close(db_fd)
-    os.unlink(db_path)
+    # Closing the connection discards the in-memory database
+    db.engine.dispose()
+
+@pytest.fixture(autouse=True)
+def _push_request_context():
+    """Override pytest-flask's per-test request context.
+
+    A context pushed around the whole test would be reused by every client
+    request, so teardown_appcontext (and with it db.session.remove()) would
+    never run between requests the way it does in production.
+    """
 
 @pytest.fixture
+def app_context(app):
+    """Push an app context for tests that use db.session without making requests."""
+    with app.app_context():
+        yield
+
+@pytest.fixture(scope='session')
+def seeded_expense_id(app):
+    """The id of the first seeded expense."""
+    return SEED_EXPENSES[0]['id']
+
+@pytest.fixture(scope='session')
+def urls(app):
+    """URLs of the fixed routes, built once with url_for so a renamed route fails fast."""
+    with app.test_request_context():
+        return SimpleNamespace(
+            index=url_for('index'),
+            add=url_for('add'),
+            import_expenses=url_for('import_expenses'),
+            categories=url_for('categories'),
+            api_expenses=url_for('api_expenses'),
+        )
+
+@pytest.fixture(scope='session')
+def route_set(app):
+    """The URL rules registered on the app, collected once per session."""
+    return frozenset(rule.rule for rule in app.url_map.iter_rules())
+
+@pytest.fixture
+def count_queries(app):
+    """Return a context manager that collects the SQL statements run inside it."""
+    @contextlib.contextmanager
+    def counter():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+    return counter
+
+@pytest.fixture(autouse=True)
+def db_session(app):
+    """Run each test inside an outer transaction that is rolled back afterwards.
+
+    The session's own commits only end its part of the outer transaction, so
+    every change a test makes (through the routes or directly) is discarded
+    and the next test sees the seeded data again.
+    """
+    connection = db.engine.connect()
+    transaction = connection.begin()
+    original_session = db.session
+    db.session = db.create_scoped_session(options={'bind': connection, 'binds': {}})
+    
+    yield db.session
+    
+    db.session.remove()
+    db.session = original_session
+    transaction.rollback()
+    connection.close()
+    # Rendered pages may reflect rows that were just rolled back
+    flask_app_module._page_cache.clear()
+
+@pytest.fixture(scope='session')
 def client(app):
-    """A test client for the app."""
+    """A test client for the app, shared by every test."""
     return app.test_client()
 
-@pytest.fixture
+@pytest.fixture(autouse=True)
+def clear_cookies(client):
+    """Drop the client's cookies after each test so flash messages don't leak into the next."""
+    yield
+    client.cookie_jar.clear()
+
+@pytest.fixture(scope='session')
 def runner(app):
     """A test CLI runner for the app."""
     return app.test_cli_runner()
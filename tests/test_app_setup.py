@@ -1,7 +1,10 @@
 """
 Test file for testing the application setup and configuration.
 """
-import os
+import functools
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from app import SCHEMA_VERSION, migrate_db
 
 def test_app_config(app):
     """Test that the app is configured correctly."""
@@ -10,14 +13,55 @@ def test_app_config(app):
     assert app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] == False
     assert app.secret_key == 'expense_tracker_secret_key'
     
-def test_app_routes_registered(app):
-    """Test that all necessary routes are registered."""
-    routes = [rule.rule for rule in app.url_map.iter_rules()]
-    
-    # Check that all expected routes are registered
-    assert '/' in routes
-    assert '/add' in routes
-    assert '/edit/<int:id>' in routes
-    assert '/delete/<int:id>' in routes
-    assert '/categories' in routes
-    assert '/api/expenses' in routes
+@pytest.mark.parametrize('route', [
+    '/', '/add', '/import', '/edit/<int:id>', '/delete/<int:id>', '/categories', '/api/expenses'
+])
+def test_route_registered(route_set, route):
+    """Test that each necessary route is registered."""
+    assert route in route_set
+
+def test_init_db_command(runner, tmp_path, monkeypatch):
+    """Test that the init-db CLI command migrates the database."""
+    # Migrate a scratch file so the PRAGMAs and COMMIT never touch the shared test connection
+    engine = create_engine(f"sqlite:///{tmp_path / 'init.db'}")
+    monkeypatch.setattr('app.migrate_db', functools.partial(migrate_db, engine))
+
+    result = runner.invoke(args=['init-db'])
+
+    with engine.connect() as conn:
+        tables = inspect(conn).get_table_names()
+        version = conn.execute(text('PRAGMA user_version')).scalar()
+    engine.dispose()
+
+    assert result.exit_code == 0
+    assert 'Database schema is up to date.' in result.output
+    assert 'expense' in tables
+    assert version == SCHEMA_VERSION
+
+def test_migrate_converts_real_amounts_to_cents(tmp_path):
+    """Test that a database from before the cents column is upgraded with its amounts intact."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE expense (id INTEGER NOT NULL PRIMARY KEY, title VARCHAR(100) NOT NULL, '
+            'amount FLOAT NOT NULL, category VARCHAR(50) NOT NULL, date DATE NOT NULL, description TEXT)'
+        ))
+        conn.execute(text('CREATE INDEX ix_expense_category ON expense (category)'))
+        conn.execute(text(
+            "INSERT INTO expense (id, title, amount, category, date) VALUES "
+            "(1, 'Grocery Shopping', 150.75, 'Food', '2025-05-01'), "
+            "(2, 'Electric Bill', 87.3, 'Utilities', '2025-05-05')"
+        ))
+
+    migrate_db(engine)
+
+    with engine.connect() as conn:
+        columns = {column['name'] for column in inspect(conn).get_columns('expense')}
+        rows = conn.execute(text('SELECT id, amount_cents FROM expense ORDER BY id')).all()
+        version = conn.execute(text('PRAGMA user_version')).scalar()
+    engine.dispose()
+
+    assert 'amount' not in columns
+    assert {'amount_cents', 'updated_at'} <= columns
+    assert [tuple(row) for row in rows] == [(1, 15075), (2, 8730)]
+    assert version == SCHEMA_VERSION
@@ -1,58 +1,89 @@
 """
 Test file for testing database models in the expense tracker application.
 """
-from datetime import datetime, date
-from app import Expense, db
+from datetime import date
+from sqlalchemy import text
+from app import Expense, db, bulk_add
 
-def test_expense_model(app):
+FIXED_DATE = date(2025, 5, 20)
+
+def test_expense_model(app_context, db_session):
     """Test the Expense model."""
-    with app.app_context():
-        # Create a new expense
-        expense = Expense(
-            title='Test Model',
-            amount=100.00,
-            category='Test',
-            date=datetime.strptime('2025-05-20', '%Y-%m-%d'),
-            description='Test description'
-        )
-        
-        # Add to database
-        db.session.add(expense)
-        db.session.commit()
-        
-        # Query the database
-        queried_expense = Expense.query.filter_by(title='Test Model').first()
-        
-        # Check that the expense was created properly
-        assert queried_expense is not None
-        assert queried_expense.title == 'Test Model'
-        assert queried_expense.amount == 100.00
-        assert queried_expense.category == 'Test'
-        assert queried_expense.date == datetime.strptime('2025-05-20', '%Y-%m-%d').date()
-        assert queried_expense.description == 'Test description'
-        
-        # Test __repr__ method
-        assert repr(queried_expense) == '<Expense Test Model>'
-        
-def test_expense_default_date(app):
+    # Create a new expense
+    expense = Expense(
+        title='Test Model',
+        amount=100.00,
+        category='Test',
+        date=FIXED_DATE,
+        description='Test description'
+    )
+    
+    # Add to database
+    db_session.add(expense)
+    db_session.commit()
+    
+    # Query the database
+    queried_expense = db_session.query(Expense).filter_by(title='Test Model').first()
+    
+    # Check that the expense was created properly
+    assert queried_expense is not None
+    assert queried_expense.title == 'Test Model'
+    assert queried_expense.amount == 100.00
+    assert queried_expense.category == 'Test'
+    assert queried_expense.date == FIXED_DATE
+    assert queried_expense.description == 'Test description'
+    
+    # Test __repr__ method
+    assert repr(queried_expense) == '<Expense Test Model>'
+    
+def test_expense_default_date(app_context, db_session):
     """Test that the expense model uses default date when none is provided."""
-    with app.app_context():
-        # Create a new expense without a date
-        expense = Expense(
-            title='No Date Expense',
-            amount=50.00,
-            category='Test',
-            description='No date provided'
-        )
-        
-        # Add to database
-        db.session.add(expense)
-        db.session.commit()
-        
-        # Query the database
-        queried_expense = Expense.query.filter_by(title='No Date Expense').first()
-        
-        # Check that a date was assigned
-        assert queried_expense.date is not None
-        # Since we don't know when the test will run, just verify it's a valid date
-        assert isinstance(queried_expense.date, date)
+    # Create a new expense without a date
+    expense = Expense(
+        title='No Date Expense',
+        amount=50.00,
+        category='Test',
+        description='No date provided'
+    )
+    
+    # Add to database
+    db_session.add(expense)
+    db_session.commit()
+    
+    # Query the database
+    queried_expense = db_session.query(Expense).filter_by(title='No Date Expense').first()
+    
+    # Check that a date was assigned
+    assert queried_expense.date is not None
+    # Since we don't know when the test will run, just verify it's a valid date
+    assert isinstance(queried_expense.date, date)
+
+def test_bulk_add(app_context):
+    """Test inserting several expenses in one batch."""
+    inserted = bulk_add([
+        {'title': 'Bulk One', 'amount': 10.00, 'category': 'Test', 'date': date(2025, 5, 21)},
+        {'title': 'Bulk Two', 'amount': 20.00, 'category': 'Test', 'date': date(2025, 5, 22)},
+    ])
+
+    assert inserted == 2
+    titles = {expense.title for expense in Expense.query.filter_by(category='Test').all()}
+    assert titles == {'Bulk One', 'Bulk Two'}
+
+def test_list_ordering_uses_date_index(app_context):
+    """Test that ORDER BY date DESC, id walks the composite index without sorting."""
+    plan = db.session.execute(text(
+        'EXPLAIN QUERY PLAN SELECT id, date FROM expense ORDER BY date DESC, id'
+    )).all()
+    details = ' '.join(row[-1] for row in plan)
+
+    assert 'ix_expense_date_id' in details
+    assert 'TEMP B-TREE' not in details
+
+def test_amount_stored_as_cents(app_context):
+    """Test that amounts are stored as exact integer cents and read back in dollars."""
+    stored = db.session.execute(text('SELECT amount_cents FROM expense WHERE id = 1')).scalar()
+    assert stored == 15075
+    assert db.session.get(Expense, 1).amount == 150.75
+
+    total = db.session.query(db.func.sum(Expense.amount)).scalar()
+    assert total == 273.55
@@ -1,26 +1,86 @@
 """
 Test file for testing routes in the expense tracker application.
 """
-from datetime import datetime
+from datetime import date
+from decimal import Decimal
+import gzip
+import io
 import json
+import re
+import pytest
+from app import PAGE_SIZE, Expense, _page_cache, bulk_add, db
 
-def test_index_route(client):
+# Expected fragments of a page, matched in a single scan of the response body
+_ADD_OK = re.compile(rb'Expense added successfully!|Test Expense|\$75\.50|Test Category')
+_CATEGORIES_OK = re.compile(rb'Categories|Food|Entertainment')
+
+# Fields every /api/expenses row must carry
+_API_FIELDS = frozenset({'id', 'title', 'amount', 'category', 'date', 'description'})
+
+def test_index_route(client, urls):
     """Test the index route displaying expenses."""
-    response = client.get('/')
+    response = client.get(urls.index)
     assert response.status_code == 200
     # Test if the page loads - look for key elements that should be there
     assert b'Expenses' in response.data
     
-def test_add_expense_get(client):
+def test_index_pagination(client, urls):
+    """Test that the index lists a page of expenses at a time."""
+    bulk_add(
+        {'title': f'Paged Expense {i}', 'amount': 1.00, 'category': 'Test', 'date': date(2024, 1, 1)}
+        for i in range(PAGE_SIZE)
+    )
+
+    first_page = client.get(urls.index)
+    assert b'Grocery Shopping' in first_page.data
+    assert b'page=2' in first_page.data
+
+    second_page = client.get(urls.index, query_string={'page': 2})
+    assert second_page.status_code == 200
+    assert b'Grocery Shopping' not in second_page.data
+    assert b'Paged Expense' in second_page.data
+
+@pytest.mark.parametrize('page', [2, 10 ** 19])
+def test_index_page_past_end(client, urls, page):
+    """Test that pages beyond the last one are not found rather than rendered and cached."""
+    response = client.get(urls.index, query_string={'page': page})
+    assert response.status_code == 404
+    assert ('index', page) not in _page_cache
+
+def test_index_page_cache_is_bounded(client, urls, monkeypatch):
+    """Test that the least recently used pages are evicted once the cache is full."""
+    monkeypatch.setattr('app.PAGE_CACHE_SIZE', 2)
+    bulk_add(
+        {'title': f'Paged Expense {i}', 'amount': 1.00, 'category': 'Test', 'date': date(2024, 1, 1)}
+        for i in range(2 * PAGE_SIZE)
+    )
+
+    for page in (1, 2, 3):
+        assert client.get(urls.index, query_string={'page': page}).status_code == 200
+    assert list(_page_cache) == [('index', 2), ('index', 3)]
+
+def test_totals_of_near_max_amounts(client, urls):
+    """Test that totals past the 64-bit cents range still render instead of overflowing."""
+    bulk_add(
+        {'title': f'Huge Expense {i}', 'amount': Decimal('90000000000000000'), 'category': 'Huge',
+         'date': date(2025, 5, 20)}
+        for i in range(2)
+    )
+
+    assert client.get(urls.index).status_code == 200
+    assert client.get(urls.categories).status_code == 200
+
+def test_add_expense_get(client, urls):
     """Test the GET request to the add expense page."""
-    response = client.get('/add')
+    response = client.get(urls.add)
     assert response.status_code == 200
-    assert b'Add New Expense' in response.data
-    assert b'<form' in response.data
+    body = response.get_data()
+    assert b'Add New Expense' in body
+    assert b'<form' in body
     
-def test_add_expense_post(client, app):
+def test_add_expense_post(client, db_session, urls):
     """Test adding a new expense."""
-    response = client.post('/add', data={
+    response = client.post(urls.add, data={
         'title': 'Test Expense',
         'amount': '75.50',
         'category': 'Test Category',
@@ -29,30 +89,60 @@ def test_add_expense_post(client, app):
     }, follow_redirects=True)
     
     assert response.status_code == 200
-    assert b'Expense added successfully!' in response.data
-    assert b'Test Expense' in response.data
-    assert b'$75.50' in response.data
-    assert b'Test Category' in response.data
+    assert set(_ADD_OK.findall(response.data)) >= {
+        b'Expense added successfully!', b'Test Expense', b'$75.50', b'Test Category'
+    }
     
     # Verify expense was added to database
-    with app.app_context():
-        from app import Expense
-        expense = Expense.query.filter_by(title='Test Expense').first()
-        assert expense is not None
-        assert expense.amount == 75.50
-        assert expense.category == 'Test Category'
-        assert expense.description == 'This is a test expense'
-        
+    expense = db_session.execute(db.select(Expense).filter_by(title='Test Expense')).scalar_one_or_none()
+    assert expense is not None
+    assert expense.amount == 75.50
+    assert expense.category == 'Test Category'
+    assert expense.description == 'This is a test expense'
+    
+def test_import_expenses_csv(client, urls):
+    """Test importing expenses from an uploaded CSV file."""
+    csv_data = (
+        b'title,amount,category,date,description\n'
+        b'Bus Pass,45.00,Transportation,2025-05-12,Monthly pass\n'
+        b'Book,12.99,Education,,\n'
+    )
+    response = client.post(urls.import_expenses, data={
+        'file': (io.BytesIO(csv_data), 'expenses.csv')
+    }, content_type='multipart/form-data', follow_redirects=True)
+
+    assert response.status_code == 200
+    assert b'Imported 2 expenses' in response.data
+
+    assert Expense.query.filter_by(title='Bus Pass').first().amount == 45.00
+    assert Expense.query.filter_by(title='Book').first().date is not None
+
+@pytest.mark.parametrize('bad_amount', [b'not-a-number', b'1e17'])
+def test_import_expenses_rejects_invalid_csv(client, urls, bad_amount):
+    """Test that a CSV with an invalid line imports nothing."""
+    csv_data = (
+        b'title,amount,category\n'
+        b'Good Line,10.00,Food\n'
+        b'Bad Line,' + bad_amount + b',Food\n'
+    )
+    response = client.post(urls.import_expenses, data={
+        'file': (io.BytesIO(csv_data), 'expenses.csv')
+    }, content_type='multipart/form-data', follow_redirects=True)
+
+    assert b'line 3 is invalid' in response.data
+    assert Expense.query.filter_by(title='Good Line').first() is None
+
 def test_edit_expense_get(client):
     """Test the GET request to edit an expense."""
     # Get the first expense (id=1)
     response = client.get('/edit/1')
     assert response.status_code == 200
-    assert b'Edit Expense' in response.data
-    assert b'Grocery Shopping' in response.data
-    assert b'150.75' in response.data
+    body = response.get_data()
+    assert b'Edit Expense' in body
+    assert b'Grocery Shopping' in body
+    assert b'150.75' in body
     
-def test_edit_expense_post(client, app):
+def test_edit_expense_post(client, db_session):
     """Test editing an expense."""
     response = client.post('/edit/1', data={
         'title': 'Updated Grocery Shopping',
@@ -60,67 +150,166 @@ def test_edit_expense_post(client, app):
         'category': 'Food',
         'date': '2025-05-01',
         'description': 'Updated grocery description'
-    }, follow_redirects=True)
+    })
     
-    assert response.status_code == 200
-    assert b'Expense updated successfully!' in response.data
-    assert b'Updated Grocery Shopping' in response.data
+    # Read the flash from the session rather than rendering the redirect target
+    assert response.status_code == 302
+    with client.session_transaction() as sess:
+        assert ('success', 'Expense updated successfully!') in sess.get('_flashes', [])
     
     # Verify expense was updated in database
-    with app.app_context():
-        from app import Expense
-        expense = Expense.query.filter_by(id=1).first()
-        assert expense.title == 'Updated Grocery Shopping'
-        assert expense.amount == 160.25
-        assert expense.description == 'Updated grocery description'
-        
-def test_delete_expense(client, app):
+    expense = db_session.get(Expense, 1)
+    assert expense.title == 'Updated Grocery Shopping'
+    assert expense.amount == 160.25
+    assert expense.description == 'Updated grocery description'
+    
+def test_delete_expense(client):
     """Test deleting an expense."""
-    response = client.get('/delete/2', follow_redirects=True)
-    assert response.status_code == 200
-    assert b'Expense deleted successfully!' in response.data
+    response = client.post('/delete/2')
+    assert response.status_code == 302
+    with client.session_transaction() as sess:
+        assert ('danger', 'Expense deleted successfully!') in sess.get('_flashes', [])
     
     # Verify expense was deleted from database
-    with app.app_context():
-        from app import Expense
-        expense = Expense.query.filter_by(id=2).first()
-        assert expense is None
+    assert db.session.get(Expense, 2) is None
         
-def test_categories_route(client):
+def test_index_cache_invalidated_on_edit(client, urls):
+    """Test that the cached index page is rebuilt after an expense changes."""
+    client.get(urls.index)  # Prime the page cache
+    client.post('/edit/1', data={
+        'title': 'Recached Grocery Shopping',
+        'amount': '150.75',
+        'category': 'Food',
+        'date': '2025-05-01',
+        'description': 'Weekly groceries'
+    })
+    client.get(urls.index)  # Consumes the flash message, which is never cached
+
+    response = client.get(urls.index)
+    assert response.status_code == 200
+    assert b'Recached Grocery Shopping' in response.data
+
+def test_index_query_count(client, count_queries, urls):
+    """Test that the index issues a fixed number of statements, and only one when cached."""
+    with count_queries() as statements:
+        client.get(urls.index)
+    # Fingerprint, page of expenses and total
+    assert len(statements) == 3
+
+    with count_queries() as statements:
+        client.get(urls.index)
+    # Only the fingerprint check on a cache hit
+    assert len(statements) == 1
+
+    # The statement count does not grow with the number of listed rows
+    bulk_add(
+        {'title': f'Counted Expense {i}', 'amount': 1.00, 'category': 'Test', 'date': date(2024, 1, 1)}
+        for i in range(10)
+    )
+    with count_queries() as statements:
+        client.get(urls.index)
+    assert len(statements) == 3
+
+def test_categories_route(client, urls):
     """Test the categories summary page."""
-    response = client.get('/categories')
+    response = client.get(urls.categories)
+    assert response.status_code == 200
+    assert set(_CATEGORIES_OK.findall(response.data)) >= {b'Categories', b'Food', b'Entertainment'}
+
+def test_categories_sums_per_category(client, urls):
+    """Test that the categories page totals every expense in a category."""
+    client.post(urls.add, data={
+        'title': 'Farmers Market',
+        'amount': '49.25',
+        'category': 'Food',
+        'date': '2025-05-12',
+        'description': ''
+    })
+
+    response = client.get(urls.categories)
     assert response.status_code == 200
-    assert b'Expense Categories' in response.data or b'Categories' in response.data
-    assert b'Food' in response.data
-    assert b'Entertainment' in response.data
+    assert b'$200.00' in response.data  # 150.75 seeded + 49.25 added
+
+def test_categories_conditional_get(client, urls):
+    """Test that the categories page answers 304 while the data is unchanged."""
+    etag = client.get(urls.categories).headers['ETag']
+
+    response = client.get(urls.categories, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
 
-def test_api_expenses(client):
+def test_api_expenses(client, count_queries, urls):
     """Test the API endpoint for expenses."""
-    response = client.get('/api/expenses')
+    with count_queries() as statements:
+        response = client.get(urls.api_expenses)
+        # The body streams, so read it while the statements are still being counted
+        response.get_data()
     assert response.status_code == 200
+    # The ETag fingerprint and the row select, however many rows there are
+    assert len(statements) <= 2
     
     # Check that response is JSON
-    data = response.get_json()
+    data = json.loads(response.data)
     assert isinstance(data, list)
     
     # Check the first expense data
     assert data[0]['title'] == 'Grocery Shopping' or data[2]['title'] == 'Grocery Shopping'
     
-    # Make sure all expenses have the required fields
+    # Make sure all expenses have the required fields; a failure shows the missing ones
     for expense in data:
-        assert 'id' in expense
-        assert 'title' in expense
-        assert 'amount' in expense
-        assert 'category' in expense
-        assert 'date' in expense
-        assert 'description' in expense
-
-def test_non_existent_expense_edit(client):
-    """Test accessing a non-existent expense for editing."""
-    response = client.get('/edit/999')
-    assert response.status_code == 404
+        assert not _API_FIELDS - expense.keys()
+
+def test_api_expenses_gzip(client, urls):
+    """Test that the API gzips its payload for clients that accept it."""
+    response = client.get(urls.api_expenses, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
 
-def test_non_existent_expense_delete(client):
-    """Test deleting a non-existent expense."""
-    response = client.get('/delete/999')
+    data = json.loads(gzip.decompress(response.data))
+    assert len(data) == 3
+
+def test_api_expenses_etag_per_encoding(client, urls):
+    """Test that gzipped and identity payloads carry distinct ETags, and 304s keep Vary."""
+    identity_etag = client.get(urls.api_expenses).headers['ETag']
+    gzip_etag = client.get(urls.api_expenses, headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    assert identity_etag != gzip_etag
+
+    # The identity validator must not revalidate the gzipped representation
+    response = client.get(urls.api_expenses, headers={'Accept-Encoding': 'gzip', 'If-None-Match': identity_etag})
+    assert response.status_code == 200
+
+    response = client.get(urls.api_expenses, headers={'Accept-Encoding': 'gzip', 'If-None-Match': gzip_etag})
+    assert response.status_code == 304
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+def test_api_expenses_empty(client, urls):
+    """Test that the streamed API still returns a valid array with no expenses."""
+    for expense_id in (1, 2, 3):
+        client.post(f'/delete/{expense_id}')
+
+    response = client.get(urls.api_expenses)
+    assert response.status_code == 200
+    assert json.loads(response.data) == []
+
+def test_api_expenses_conditional_get(client, urls):
+    """Test that the API answers 304 while the data is unchanged."""
+    etag = client.get(urls.api_expenses).headers['ETag']
+
+    response = client.get(urls.api_expenses, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    client.post('/delete/3')
+    response = client.get(urls.api_expenses, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+
+@pytest.mark.parametrize('method, path', [('GET', '/edit/999'), ('POST', '/delete/999')])
+def test_non_existent_expense(client, method, path):
+    """Test editing or deleting a non-existent expense."""
+    response = client.open(path, method=method)
     assert response.status_code == 404
+
+def test_delete_requires_post(client):
+    """Test that deleting through a GET request is rejected."""
+    response = client.get('/delete/1')
+    assert response.status_code == 405
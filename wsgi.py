@@ -0,0 +1,6 @@
+"""
+WSGI entry point for production servers, e.g.:
+
+    gunicorn --workers 4 --threads 4 wsgi:application
+"""
+from app import app as application